@@ -72,6 +72,10 @@ OLLAMA_MODEL = _cfg["model"]
 # Supported file extensions for Adding files and Drag and drop
 IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.heic', '.heif'}
 
+# Used in src/ui/image_loader.py
+# Queue previews only need to fill the image viewer, not the full resolution
+PREVIEW_IMAGE_SIZE = (1024, 1024)
+
 # Configuration from Ollama Modelfile
 INFERENCE_PARAMS = {
     "temperature": 0,
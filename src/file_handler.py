@@ -2,6 +2,9 @@
 # Handles loading and preprocessing of images and PDF files for OCR.
 
 import io
+import os
+import threading
+from collections import OrderedDict
 import fitz # PyMuPDF
 from PIL import Image # Pillow
 import pillow_heif # Handle HEIC images
@@ -13,23 +16,78 @@ pillow_heif.register_heif_opener()
 # Disable Pillow's safety limit for very large images (e.g. scanned documents)
 Image.MAX_IMAGE_PIXELS = None
 
+# Recently opened PDFs, path -> ((mtime_ns, size), document), most recently used last.
+# Opening a PDF parses its xref table, so keep a few documents around
+# instead of reopening the file for every page.
+# The stat signature catches a file that was edited and re-added at the same path.
+PDF_CACHE_SIZE = 4
+_pdf_cache = OrderedDict()
+
+# PyMuPDF is not thread-safe and the OCR worker, preview loader and UI
+# thread all share the cached documents, so hold this while using one.
+_pdf_lock = threading.Lock()
+
+
+def flatten_to_rgb(img: Image.Image) -> Image.Image:
+    # Return img as RGB, with any transparency flattened onto white.
+    # A plain convert('RGB') drops alpha and exposes whatever color sits
+    # under transparent pixels (often black).
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        # Grayscale stays grayscale until the final convert: blending
+        # 1 band instead of expanding to RGBA first
+        if img.mode not in ('RGBA', 'LA'):
+            img = img.convert('RGBA')
+        # Skip the white canvas (allocate + fill + paste) when nothing is
+        # actually transparent, e.g. screenshots saved as RGBA
+        if img.getextrema()[-1][0] < 255:
+            background = Image.new(img.mode[:-1], img.size, 'white')
+            # An image with alpha is its own mask: one C pass, no split() into bands
+            background.paste(img, mask=img)
+            img = background
+
+    # Ensure RGB format (matches Ollama/vLLM implementation)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
 
 # Ollama already handled the image padding
 # See: https://github.com/ollama/ollama/blob/main/model/models/deepseekocr/imageprocessor.go
-def preprocess_image(img: Image.Image) -> bytes:
-    # Apply standard preprocessing and return PNG bytes.
+def preprocess_image(img: Image.Image, fmt: str = 'PNG') -> bytes:
+    # Apply standard preprocessing and return encoded bytes (PNG by default).
     # We DO NOT resize or pad here because Ollama needs the original
     # high-resolution image to perform its own multi-view cropping.
+    img = flatten_to_rgb(img)
 
-    # Ensure RGB format (matches Ollama/vLLM implementation)
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-
-    # Export as PNG bytes (lossless format preserves text quality)
     img_buffer = io.BytesIO()
-    img.save(img_buffer, format='PNG')
+    if fmt == 'PNG':
+        # Export as PNG bytes (lossless format preserves text quality)
+        # compress_level=1 (Z_BEST_SPEED): Deflate dominates this function and
+        # the bytes only travel to a local Ollama server, so size barely matters
+        img.save(img_buffer, format='PNG', compress_level=1, optimize=False)
+    else:
+        img.save(img_buffer, format=fmt, quality=92)
     return img_buffer.getvalue()
 
+def fit_to_size(img: Image.Image, max_size) -> Image.Image:
+    # Downscale an image to fit inside max_size, keeping aspect ratio.
+    # Used for previews only, never for OCR input. May modify img in place.
+    if img.width <= max_size[0] and img.height <= max_size[1]:
+        return img
+
+    # resize() silently falls back to NEAREST for 1-bit and palette images.
+    # Convert to the smallest mode that keeps the content, so LANCZOS
+    # (and the flatten in flatten_to_rgb) touch as few bands as possible.
+    if img.mode == '1':
+        img = img.convert('L')
+    elif img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+    # thumbnail() does the fit-into math in C and box-reduces by an integer
+    # factor first (reducing_gap), so LANCZOS only runs on an image at most
+    # 3x the target size
+    img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
 def get_image_bytes(filepath):
     # Read an image file, preprocess it, and return PNG bytes.
     try:
@@ -41,44 +99,97 @@ def get_image_bytes(filepath):
         with open(filepath, "rb") as f:
             return f.read()
 
+def get_image_preview(filepath, max_size):
+    # Read an image file scaled to fit max_size.
+    # Returns (raw RGB888 bytes, width, height), ready for QImage without decoding.
+    with Image.open(filepath) as img:
+        if img.format == 'JPEG':
+            # Let the JPEG decoder downscale during IDCT (1/2, 1/4, 1/8)
+            # Result stays >= max_size, so LANCZOS still does the final fit
+            img.draft('RGB', max_size)
+        img = flatten_to_rgb(fit_to_size(img, max_size))
+        return img.tobytes(), img.width, img.height
+
+def open_pdf(filepath):
+    # Return a cached fitz.Document for filepath. Caller must hold _pdf_lock.
+    st = os.stat(filepath)
+    signature = (st.st_mtime_ns, st.st_size)
+
+    cached = _pdf_cache.get(filepath)
+    if cached is not None:
+        if cached[0] == signature:
+            _pdf_cache.move_to_end(filepath)
+            return cached[1]
+        # File changed on disk since it was opened
+        del _pdf_cache[filepath]
+        cached[1].close()
+
+    doc = fitz.open(filepath)
+    _pdf_cache[filepath] = (signature, doc)
+    if len(_pdf_cache) > PDF_CACHE_SIZE:
+        _, (_, oldest) = _pdf_cache.popitem(last=False)
+        oldest.close()
+    return doc
+
+def close_pdf_cache():
+    # Close all cached PDFs (releases the file handles).
+    with _pdf_lock:
+        for _, doc in _pdf_cache.values():
+            doc.close()
+        _pdf_cache.clear()
+
 def get_pdf_page_count(filepath):
     # Return the number of pages in a PDF without loading images.
     try:
-        doc = fitz.open(filepath)
-        count = len(doc)
-        doc.close()
-        return count
+        with _pdf_lock:
+            return len(open_pdf(filepath))
     except Exception as e:
         print(f"Failed to get PDF page count for {filepath}: {e}")
         return 0
 
+def render_pdf_page(filepath, page_index, target_dpi=144, max_size=None):
+    # Render a PDF page to an RGB fitz.Pixmap.
+    # max_size is only for previews, OCR always renders at target_dpi.
+    with _pdf_lock:
+        page = open_pdf(filepath).load_page(page_index)
+
+        # Cap maximum dimension to prevent malloc errors
+        # 3500 Causes long freeze, 2000 causes infinite looping
+        MAX_DIM = 3000
+        rect = page.rect
+        width, height = rect.width, rect.height
+
+        if max_size:
+            # Preview: let MuPDF rasterize straight to the target size instead
+            # of rendering at full DPI and resampling with LANCZOS afterwards
+            zoom = min(max_size[0] / width, max_size[1] / height)
+        else:
+            # Calculate zoom based on DPI
+            # 144 / 72.0 (Default PDF DPI) = 2.0x zoom.
+            zoom = target_dpi / 72.0
+
+            # If 144 DPI results in a huge image (>3000px), scale down to fit MAX_DIM.
+            if (width * zoom > MAX_DIM) or (height * zoom > MAX_DIM):
+                zoom = MAX_DIM / max(width, height)
+            zoom = max(zoom, 0.5)  # Minimum 50% zoom to ensure readability
+
+        # fitz.Matrix applies uniform scaling in both dimensions
+        # The pixmap owns its samples, so it stays valid after the lock is released
+        matrix = fitz.Matrix(zoom, zoom)
+        return page.get_pixmap(matrix=matrix, alpha=False)
+
 def extract_pdf_page_bytes(filepath, page_index, target_dpi=144):
     # Render a PDF page as an image, preprocess it, and return PNG bytes.
-    doc = fitz.open(filepath)
-    page = doc.load_page(page_index)
-
-    # Cap maximum dimension to prevent malloc errors
-    # 3500 Causes long freeze, 2000 causes infinite looping
-    MAX_DIM = 3000
-    rect = page.rect
-    width, height = rect.width, rect.height
-
-    # Calculate zoom based on DPI
-    # 144 / 72.0 (Default PDF DPI) = 2.0x zoom.
-    zoom = target_dpi / 72.0
-
-    # If 144 DPI results in a huge image (>3000px), scale down to fit MAX_DIM.
-    if (width * zoom > MAX_DIM) or (height * zoom > MAX_DIM):
-        zoom = MAX_DIM / max(width, height)
-    zoom = max(zoom, 0.5)  # Minimum 50% zoom to ensure readability
-
-    # fitz.Matrix applies uniform scaling in both dimensions
-    matrix = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=matrix, alpha=False)
-
-    # Convert PyMuPDF pixmap to PIL Image, then preprocess
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    img_bytes = preprocess_image(img)
-
-    doc.close()
-    return img_bytes
\ No newline at end of file
+    pix = render_pdf_page(filepath, page_index, target_dpi)
+
+    # Convert PyMuPDF pixmap to PIL Image.
+    # samples_mv is a memoryview over MuPDF's own buffer, unlike .samples
+    # which first copies the whole page into a bytes object.
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples_mv)
+    return preprocess_image(img)
+
+def extract_pdf_page_preview(filepath, page_index, max_size):
+    # Render a PDF page scaled to fit max_size.
+    # Returns (raw RGB888 bytes, width, height), the pixmap samples need no PIL.
+    pix = render_pdf_page(filepath, page_index, max_size=max_size)
+    return pix.samples, pix.width, pix.height
@@ -9,16 +9,6 @@ import ctypes
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-from ollama import Client
-from ui.main_window import MainWindow
-import config
-
-# Windows-specific feature: Set AppUserModelID to group taskbar icons
-if config.WIN_TASKBAR_PROGRESS_SUPPORT:
-    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(config.APP_ID)
-
 def load_stylesheet(app):
     # Load Nord theme from style.qss
     style_path = os.path.join(current_dir, "style.qss")
@@ -27,6 +17,19 @@ def load_stylesheet(app):
             app.setStyleSheet(f.read())
 
 def main():
+    # Imported here, not at module level: the preview worker processes are
+    # spawned and re-run this file as __mp_main__, they must not load Qt
+    # (and QtWebEngine) or touch the taskbar ID
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+    from ui.main_window import MainWindow
+    from ollama_service import get_client
+    import config
+
+    # Windows-specific feature: Set AppUserModelID to group taskbar icons
+    if config.WIN_TASKBAR_PROGRESS_SUPPORT:
+        ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(config.APP_ID)
+
     app = QApplication(sys.argv)
 
     # Load Theme
@@ -37,7 +40,7 @@ def main():
     if os.path.exists(icon_path):
         app.setWindowIcon(QIcon(icon_path))
 
-    client = Client(host=config.OLLAMA_HOST)
+    client = get_client()
 
     window = MainWindow(client)
     # We have to use the whole screen...
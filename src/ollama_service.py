@@ -6,6 +6,22 @@ from PySide6.QtCore import QThread, Signal
 import httpx
 import config
 
+# Shared client, see get_client()
+_client = None
+_client_host = None
+
+
+def get_client() -> Client:
+    # Return the shared Ollama client for config.OLLAMA_HOST.
+    # All requests go through one httpx connection pool (keep-alive is on by
+    # default), so pages reuse the same socket instead of reconnecting.
+    # A new client is only created when the host changes in Settings.
+    global _client, _client_host
+    if _client is None or _client_host != config.OLLAMA_HOST:
+        _client = Client(host=config.OLLAMA_HOST)
+        _client_host = config.OLLAMA_HOST
+    return _client
+
 
 def stream_ocr_response(client: Client, model_name: str, prompt: str, image_bytes: bytes, options: dict = None):
     stream = client.chat(
@@ -21,7 +37,11 @@ def stream_ocr_response(client: Client, model_name: str, prompt: str, image_byte
 
     for chunk in stream:
         # Navigate the nested response structure to extract text
-        content = chunk.get('message', {}).get('content', '')
+        # Index directly: .get('message', {}) built a throwaway dict per token
+        try:
+            content = chunk['message']['content']
+        except (KeyError, TypeError):
+            continue
         if content:
             yield content
 
@@ -2,18 +2,16 @@
 # Left panel containing file queue controls, image viewer, and processing buttons.
 
 import os
-import random
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QListWidget, QFileDialog, QLabel,
                                QProgressBar, QMessageBox, QDialog, QSpacerItem, QSizePolicy)
 from PySide6.QtCore import Signal, QTimer
-from PySide6.QtGui import QColor
 
 import config
 import file_handler
 from .dialogs import PageRangeDialog
-from .image_viewer import ImageViewer
-from .image_loader import ImageLoaderThread
+from .image_viewer import ImageViewer, BOX_PALETTE
+from .image_loader import ImageLoaderThread, PagePrefetcher
 
 
 class ControlPanel(QWidget):
@@ -33,10 +31,16 @@ class ControlPanel(QWidget):
         # Stores bounding boxes per image: {index: [(coords, color), ...]}
         self.image_boxes = {}
         self.current_processing_index = -1
+        self.is_processing = False # OCR run active, see set_processing_state()
         self.t = {} # Translation dictionary
 
         self.loader_thread = None # Background thread for loading images
 
+        # Process pool that pre-renders neighbouring PDF pages
+        self.prefetcher = PagePrefetcher(self)
+        self.prefetcher.image_loaded.connect(self.on_page_prefetched)
+        self.prefetcher.error_occurred.connect(lambda e: print(f"Error loading image: {e}"))
+
         # Debounce timer to prevent RAM spikes when scrolling fast
         # Without this scrolling too fast = 100% RAM usage
         self.debounce_timer = QTimer()
@@ -152,6 +156,7 @@ class ControlPanel(QWidget):
 
     def set_processing_state(self, is_processing):
         # Toggle UI elements between processing/idle states.
+        self.is_processing = is_processing
         self.btn_run.setEnabled(not is_processing)
         self.btn_stop.setEnabled(is_processing)
 
@@ -228,6 +233,8 @@ class ControlPanel(QWidget):
 
     # ==================== Top Row: Clear (Right) ====================
     def clear_queue(self):
+        self.prefetcher.clear()
+        file_handler.close_pdf_cache()
         self.image_queue.clear()
         self.image_boxes.clear()
         self.list_widget.clear()
@@ -250,6 +257,7 @@ class ControlPanel(QWidget):
         if self.loader_thread is not None and self.loader_thread.isRunning():
             self.loader_thread.cancel()
             self.loader_thread = None
+        self.prefetcher.cancel()
 
         # Cancel pending debounce
         self.debounce_timer.stop()
@@ -268,29 +276,54 @@ class ControlPanel(QWidget):
         row = self.list_widget.row(current)
         if row < 0 or row >= len(self.image_queue): return
 
+        self._load_row(row)
+
+    def _load_row(self, row):
+        # Start loading the preview for a queue row.
         name, path, page_index = self.image_queue[row]
 
         if self.loader_thread is not None and self.loader_thread.isRunning():
              self.loader_thread.cancel()
 
-        self.loader_thread = ImageLoaderThread(path, page_index)
-        self.loader_thread.image_loaded.connect(lambda b: self.on_image_loaded(b, row))
-        self.loader_thread.error_occurred.connect(lambda e: print(f"Error loading image: {e}"))
-        self.loader_thread.start()
+        if page_index != -1 and (self.prefetcher.has(path, page_index) or self.is_processing):
+            # Already rendered (or rendering) by the prefetcher, or an OCR run
+            # holds file_handler's PDF lock for its full-size renders: an
+            # in-process loader would queue behind it, and cancelling that
+            # loader blocks the UI thread in wait()
+            self.prefetcher.load(path, page_index)
+        else:
+            # Otherwise render in-process: no worker process to start, and the
+            # document is usually already in file_handler's PDF cache
+            self.prefetcher.cancel()
+            self.loader_thread = ImageLoaderThread(path, page_index)
+            self.loader_thread.image_loaded.connect(lambda raw, w, h: self.on_image_loaded(raw, w, h, row))
+            self.loader_thread.error_occurred.connect(lambda e: print(f"Error loading image: {e}"))
+            self.loader_thread.start()
+
+        # Pre-render neighbouring PDF pages so stepping through the queue is instant
+        self.prefetcher.prefetch([
+            self.image_queue[r][1:] for r in (row + 1, row + 2, row - 1)
+            if 0 <= r < len(self.image_queue) and self.image_queue[r][2] != -1
+        ])
+
+    def on_page_prefetched(self, path, page_index, raw, width, height):
+        # Callback when the prefetcher delivers the page we asked for.
+        row = self.list_widget.currentRow()
+        if 0 <= row < len(self.image_queue) and self.image_queue[row][1:] == (path, page_index):
+            self.on_image_loaded(raw, width, height, row)
 
-    def on_image_loaded(self, img_bytes, row):
+    def on_image_loaded(self, raw, width, height, row):
         # Callback when background image load completes.
         # Ignore if user already switched to different item
         if self.list_widget.currentRow() != row:
             return
 
         try:
-            self.image_viewer.display_image(img_bytes)
+            self.image_viewer.display_image(raw, width, height)
 
             # Restore any previously drawn bounding boxes for this image
             if row in self.image_boxes:
-                for coords, color in self.image_boxes[row]:
-                    self.image_viewer.draw_box(coords, color)
+                self.image_viewer.draw_boxes(self.image_boxes[row])
         except Exception as e:
             print(f"Error displaying loaded image: {e}")
 
@@ -315,12 +348,7 @@ class ControlPanel(QWidget):
             self.image_boxes.clear()
             current_row = self.list_widget.currentRow()
             if current_row >= 0 and current_row < len(self.image_queue):
-                _, path, page_index = self.image_queue[current_row]
-                if self.loader_thread is not None and self.loader_thread.isRunning():
-                    self.loader_thread.cancel()
-                self.loader_thread = ImageLoaderThread(path, page_index)
-                self.loader_thread.image_loaded.connect(lambda b: self.on_image_loaded(b, current_row))
-                self.loader_thread.start()
+                self._load_row(current_row)
 
         self.current_processing_index = index
         # Auto-scroll queue to currently processing item
@@ -334,17 +362,10 @@ class ControlPanel(QWidget):
         # Draw bounding box for current image and store for persistence.
         if self.current_processing_index == -1: return
 
-        # Generate random vibrant color
-        # R < 200, G < 200, B < 255
-        r = random.randint(0, 200)
-        g = random.randint(0, 200)
-        b = random.randint(0, 255)
-        color = QColor(r, g, b)
-
         # Store for redrawing when switching images
-        if self.current_processing_index not in self.image_boxes:
-            self.image_boxes[self.current_processing_index] = []
-        self.image_boxes[self.current_processing_index].append((coords, color))
+        boxes = self.image_boxes.setdefault(self.current_processing_index, [])
+        color = BOX_PALETTE[len(boxes) % len(BOX_PALETTE)]
+        boxes.append((coords, color))
 
         # Draw immediately if this image is currently visible
         if self.list_widget.currentRow() == self.current_processing_index:
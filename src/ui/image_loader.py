@@ -1,8 +1,12 @@
 # src/ui/image_loader.py
 # Background thread for loading images without freezing the UI.
 
-from PySide6.QtCore import QThread, Signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
 import file_handler
+import config
 
 
 class ImageLoaderThread(QThread):
@@ -12,7 +16,7 @@ class ImageLoaderThread(QThread):
     Prevents UI freezes when loading large files or rendering PDF pages.
     Supports cancellation for quick switching between queue items.
     """
-    image_loaded = Signal(bytes) # Emits PNG bytes when loading succeeds
+    image_loaded = Signal(bytes, int, int) # Emits (raw RGB888 bytes, width, height) when loading succeeds
     error_occurred = Signal(str) # Emits error message on failure
 
     def __init__(self, path, page_index, parent=None):
@@ -27,14 +31,14 @@ class ImageLoaderThread(QThread):
 
             if self.page_index == -1:
                 # Regular image file
-                img_bytes = file_handler.get_image_bytes(self.path)
+                raw, width, height = file_handler.get_image_preview(self.path, config.PREVIEW_IMAGE_SIZE)
             else:
                 # PDF page - page_index is 0-based
-                img_bytes = file_handler.extract_pdf_page_bytes(self.path, self.page_index)
+                raw, width, height = file_handler.extract_pdf_page_preview(self.path, self.page_index, config.PREVIEW_IMAGE_SIZE)
 
             # Only emit if not cancelled during load
             if not self._is_cancelled:
-                self.image_loaded.emit(img_bytes)
+                self.image_loaded.emit(raw, width, height)
         except Exception as e:
             if not self._is_cancelled:
                 self.error_occurred.emit(str(e))
@@ -43,3 +47,117 @@ class ImageLoaderThread(QThread):
         # Request cancellation - result will be discarded if still loading.
         self._is_cancelled = True
         self.wait(3000) # Wait up to 3 seconds for thread to finish
+
+
+class PagePrefetcher(QObject):
+    """
+    Pre-renders upcoming PDF pages in a process pool.
+
+    PyMuPDF is not thread-safe, so pages are rendered in separate processes
+    (which also sidesteps the GIL). Finished pages stay cached until they
+    fall out of the prefetch window. Results are picked up by polling the
+    futures from a QTimer, so all signals are emitted on the UI thread.
+
+    Workers are always spawned, never forked: a forked child would inherit
+    file_handler's open PDF documents (sharing their file offsets with this
+    process) and possibly a _pdf_lock held by another thread at fork time.
+    The worker function lives in file_handler, so a spawned child never
+    imports PySide6.
+    """
+    image_loaded = Signal(str, int, bytes, int, int) # Emits (path, page_index, raw RGB888 bytes, width, height)
+    error_occurred = Signal(str) # Emits error message on failure
+
+    POLL_INTERVAL_MS = 15
+    MAX_WORKERS = 3 # One per prefetched page (next two and previous)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = None # Created on first use, spawning processes is slow
+        self._futures = {} # (path, page_index) -> Future
+        self._wanted = None # (path, page_index) the UI is waiting for
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _submit(self, key):
+        if self._executor is None:
+            self._executor = self._new_executor()
+        try:
+            return self._executor.submit(file_handler.extract_pdf_page_preview, *key, config.PREVIEW_IMAGE_SIZE)
+        except BrokenProcessPool:
+            # A worker died (e.g. MuPDF crashed on a broken file), start over
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            return self._executor.submit(file_handler.extract_pdf_page_preview, *key, config.PREVIEW_IMAGE_SIZE)
+
+    def prefetch(self, pages):
+        # Render the given (path, page_index) pages ahead of time.
+        # Anything else that is not currently wanted is dropped from the cache.
+        keep = set(pages)
+        if self._wanted:
+            keep.add(self._wanted)
+
+        for key in list(self._futures):
+            if key not in keep:
+                self._futures.pop(key).cancel()
+
+        for key in pages:
+            if key not in self._futures:
+                self._futures[key] = self._submit(key)
+
+    def has(self, path, page_index):
+        # True if this page is already rendered or currently rendering.
+        return (path, page_index) in self._futures
+
+    def load(self, path, page_index):
+        # Emit image_loaded for this page as soon as its render is done.
+        # Submitted before prefetch() is called, so it gets the first free worker.
+        self._wanted = (path, page_index)
+        if self._wanted not in self._futures:
+            self._futures[self._wanted] = self._submit(self._wanted)
+        self._poll_timer.start()
+        self._poll()
+
+    def _poll(self):
+        future = self._futures.get(self._wanted)
+        if future is None:
+            self._poll_timer.stop()
+            return
+        if not future.done():
+            return
+
+        self._poll_timer.stop()
+        path, page_index = self._wanted
+        self._wanted = None
+        try:
+            raw, width, height = future.result()
+        except Exception as e:
+            # Drop failed render so the next request retries it
+            self._futures.pop((path, page_index), None)
+            self.error_occurred.emit(str(e))
+            return
+        self.image_loaded.emit(path, page_index, raw, width, height)
+
+    def cancel(self):
+        # Stop waiting for the pending page (prefetched pages stay cached).
+        self._wanted = None
+        self._poll_timer.stop()
+
+    def clear(self):
+        # Cancel everything, drop all cached pages and stop the workers.
+        # Each worker has its own file_handler PDF cache, so recycling the
+        # pool is what closes their documents (and releases the files).
+        self.cancel()
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,10 +1,17 @@
 # src/ui/image_viewer.py
 # Widget that displays the current image with optional bounding boxes.
 
+import random
 from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsRectItem, QSizePolicy
 from PySide6.QtGui import QPixmap, QImage, QColor, QPen, QBrush, QPainter
 from PySide6.QtCore import Qt, QRectF
 
+# Random vibrant colors for bounding boxes: R < 200, G < 200, B < 255
+# Generated once with a fixed seed, so the n-th box always gets the same color
+_rng = random.Random(42)
+BOX_PALETTE = [QColor(_rng.randint(0, 200), _rng.randint(0, 200), _rng.randint(0, 255)) for _ in range(256)]
+del _rng
+
 class ImageViewer(QGraphicsView):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -19,17 +26,27 @@ class ImageViewer(QGraphicsView):
         self.pixmap_item = None
         self.current_image_size = (0, 0)
         self.target_size = (1024, 1024) # Model's expected input size
+        self.box_count = 0 # Boxes drawn on the current image, indexes BOX_PALETTE
+
+        # Shared by all boxes, only the color changes (items keep their own copy)
+        self.box_pen = QPen()
+        self.box_pen.setWidth(4) # Thick border for visibility
+        self.box_brush = QBrush(Qt.SolidPattern)
 
-    def display_image(self, image_bytes):
-        # Load and display an image from bytes data.
+    def display_image(self, raw, width, height):
+        # Display an image from raw RGB888 bytes (tightly packed rows).
         self.scene.clear()
         self.pixmap_item = None
         self.current_image_size = (0, 0)
+        self.box_count = 0
 
-        qt_img = QImage()
-        if not qt_img.loadFromData(image_bytes):
+        if width <= 0 or height <= 0 or len(raw) < width * height * 3:
             return
 
+        # Wrap the buffer directly, no PNG decode needed.
+        # copy() detaches the QImage from the Python bytes object.
+        qt_img = QImage(raw, width, height, width * 3, QImage.Format_RGB888).copy()
+
         self.current_image_size = (qt_img.width(), qt_img.height())
         pixmap = QPixmap.fromImage(qt_img)
         self.pixmap_item = self.scene.addPixmap(pixmap)
@@ -45,7 +62,7 @@ class ImageViewer(QGraphicsView):
 
         See: https://deepwiki.com/deepseek-ai/DeepSeek-OCR/3.5-understanding-output#bounding-box-format
         coords: [x1, y1, x2, y2] in 0-999 scale
-        color: QColor (optional, generates random if not provided)
+        color: QColor (optional, next BOX_PALETTE color if not provided)
         """
         if not self.pixmap_item or self.current_image_size == (0, 0):
             return
@@ -67,29 +84,34 @@ class ImageViewer(QGraphicsView):
             rect_item = QGraphicsRectItem(QRectF(real_x1, real_y1, w, h))
 
             if color is None:
-                # Generate random vibrant color
-                # R < 200, G < 200, B < 255
-                import random
-                r = random.randint(0, 200)
-                g = random.randint(0, 200)
-                b = random.randint(0, 255)
-                color = QColor(r, g, b)
-
-            pen = QPen(color)
-            pen.setWidth(4) # Thick border for visibility
-            rect_item.setPen(pen)
+                color = BOX_PALETTE[self.box_count % len(BOX_PALETTE)]
+            self.box_count += 1
+
+            self.box_pen.setColor(color)
+            rect_item.setPen(self.box_pen)
 
             # Semi-transparent fill using same color with alpha
             brush_color = QColor(color)
             brush_color.setAlpha(80) # ~30% opacity
-            brush = QBrush(brush_color)
-            rect_item.setBrush(brush)
+            self.box_brush.setColor(brush_color)
+            rect_item.setBrush(self.box_brush)
 
             self.scene.addItem(rect_item)
 
         except Exception as e:
             print(f"Failed to draw box {coords}: {e}")
 
+    def draw_boxes(self, boxes):
+        # Draw many (coords, color) boxes at once, e.g. when restoring an image.
+        # Each addItem() updates the scene's BSP index, so disable indexing
+        # for the bulk insert and rebuild it once at the end.
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        try:
+            for coords, color in boxes:
+                self.draw_box(coords, color)
+        finally:
+            self.scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+
     def fit_content(self):
         # Scale view to fit entire scene content.
         if self.scene.sceneRect().width() > 0:
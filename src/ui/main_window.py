@@ -12,16 +12,16 @@ from PySide6.QtCore import Qt, Slot, QUrl, QTimer
 from PySide6.QtGui import QDesktopServices, QIcon
 
 import config
+import file_handler
 import lang_handler
 from ocr_worker import OCRWorker
-from ollama_service import ModelUnloadWorker, PreCheckWorker
+from ollama_service import ModelUnloadWorker, PreCheckWorker, get_client
 from .control_panel import ControlPanel
 from .output_panel import OutputPanel
 from .settings_dialog import SettingsDialog
 
-# Windows-specific feature
-if config.WIN_TASKBAR_PROGRESS_SUPPORT:
-    from win_taskbar import TaskbarProgress
+# Windows-specific feature (no-op on other platforms)
+from win_taskbar import get_taskbar
 
 
 class MainWindow(QMainWindow):
@@ -34,7 +34,7 @@ class MainWindow(QMainWindow):
         self.resize(1067, 600) # Six-seven... Six-seven... Six-seven...
 
         # Windows taskbar progress indicator
-        self.taskbar = TaskbarProgress() if config.WIN_TASKBAR_PROGRESS_SUPPORT else None
+        self.taskbar = get_taskbar()
 
         # Set Window Icon
         icon_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "res", "icon.png")
@@ -60,6 +60,12 @@ class MainWindow(QMainWindow):
             # Delay GL init to after window is fully visible
             QTimer.singleShot(0, self.force_gl_init)
 
+    def closeEvent(self, event):
+        # Stop the PDF prefetch worker processes and close cached PDFs.
+        self.control_panel.prefetcher.clear()
+        file_handler.close_pdf_cache()
+        super().closeEvent(event)
+
     def force_gl_init(self):
         # HACK: Force WebEngine GL context initialization on startup.
         # Prevents visual flicker when first switching to fancy output tab.
@@ -178,9 +184,8 @@ class MainWindow(QMainWindow):
     def show_settings(self):
         dlg = SettingsDialog(self.t, self)
         if dlg.exec():
-            # Settings changed - recreate client with new host
-            from ollama import Client
-            self.client = Client(host=config.OLLAMA_HOST)
+            # Settings changed - pick up the client for the new host
+            self.client = get_client()
 
     # ==================== Top Bar: Unload ====================
     def unload_model(self):
@@ -305,8 +310,7 @@ class MainWindow(QMainWindow):
         self.batch_start_time = time.time()
 
         # Windows-specific taskbar progress indicator
-        if self.taskbar:
-            self.taskbar.set_progress(int(self.winId()), 0, len(queue))
+        self.taskbar.begin(int(self.winId()), len(queue))
 
         self.worker = OCRWorker(self.client, queue, prompt_template, model_name, prompt_id)
 
@@ -327,8 +331,7 @@ class MainWindow(QMainWindow):
             self.worker.stop()
             self.output_panel.append_text(f"\n\n=== {self.t['msg_stopped']} ===")
             # Windows taskbar progress indicator
-            if self.taskbar:
-                self.taskbar.stop_progress(int(self.winId()))
+            self.taskbar.stop_progress()
 
     # ==================== Processing Callbacks ====================
     @Slot(str, int)
@@ -348,12 +351,7 @@ class MainWindow(QMainWindow):
             self.output_panel.append_text(f"\n")
 
         # Update Windows taskbar progress
-        if self.taskbar:
-            self.taskbar.set_progress(
-                int(self.winId()),
-                self.control_panel.progress_bar.value(),
-                self.control_panel.progress_bar.maximum()
-            )
+        self.taskbar.update(self.control_panel.progress_bar.value())
 
     @Slot()
     def on_finished(self):
@@ -361,8 +359,7 @@ class MainWindow(QMainWindow):
         self.set_processing_state(False)
         self.control_panel.update_status()
         # Windows taskbar progress indicator
-        if self.taskbar:
-            self.taskbar.stop_progress(int(self.winId()))
+        self.taskbar.stop_progress()
 
         self.output_panel.render_fancy_output()
 
@@ -3,12 +3,11 @@
 
 import os
 import re
-import html
 import markdown
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QPushButton, QLabel, QTextEdit, QMenu
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWebEngineCore import QWebEnginePage
-from PySide6.QtCore import Qt, Slot, QUrl
+from PySide6.QtCore import Qt, Slot, QUrl, QTimer
 from PySide6.QtGui import QTextCursor
 
 
@@ -33,6 +32,26 @@ tr:nth-child(even) { background-color: #FAFAFA; }
 </style>
 """
 
+# Match both display (\[...\]) and inline (\(...\)) math
+MATH_PATTERN = re.compile(r'(\\\[.*?\\\])|(\\\(.*?\\\))', re.DOTALL)
+
+# Placeholders that protect math blocks from markdown processing
+PLACEHOLDER_PATTERN = re.compile(r'MATHJAXBLOCKPLACEHOLDER(\d+)END')
+
+# Same escapes as html.escape(quote=True), done in one str.translate pass
+# instead of five chained str.replace calls
+HTML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#x27;',
+})
+
+# Building a Markdown instance compiles all of its extension regexes,
+# so keep one around and reset() it between renders (UI thread only)
+MARKDOWN_RENDERER = markdown.Markdown(extensions=['tables', 'fenced_code', 'nl2br'])
+
 
 def balance_latex_delimiters(latex):
     """
@@ -43,40 +62,35 @@ def balance_latex_delimiters(latex):
     1. Removes orphan \\right commands (no matching \\left)
     2. Adds \\right. (invisible delimiter) for unmatched \\left
     """
-    # Find all \left and \right commands with their positions
-    commands = []
-    for m in re.finditer(r'(\\left|\\right)', latex):
-        commands.append((m.start(), m.end(), m.group(0)))
-
-    to_remove = set()
+    # Single left-to-right scan: \left increases depth, \right decreases it
+    parts = []
     stack = 0
+    last_idx = 0
+    i = latex.find('\\')
 
-    # Track depth: \left increases, \right decreases
-    for start, end, cmd in commands:
-        if cmd == r'\left':
+    while i != -1:
+        if latex.startswith(r'\left', i):
             stack += 1
-        else:
+            i += 5
+        elif latex.startswith(r'\right', i):
             if stack > 0:
                 stack -= 1
             else:
-                # Unmatched \right - mark for removal
-                to_remove.add(start)
-
-    # Rebuild string, skipping marked positions
-    fixed_latex = ""
-    last_idx = 0
-    for start, end, cmd in commands:
-        if start in to_remove:
-            fixed_latex += latex[last_idx:start]
-            last_idx = end
+                # Unmatched \right - drop it
+                parts.append(latex[last_idx:i])
+                last_idx = i + 6
+            i += 6
+        else:
+            i += 1
+        i = latex.find('\\', i)
 
-    fixed_latex += latex[last_idx:]
+    parts.append(latex[last_idx:])
 
     # Add invisible delimiters for unmatched \left
     if stack > 0:
-        fixed_latex += (r" \right." * stack)
+        parts.append(r" \right." * stack)
 
-    return fixed_latex
+    return "".join(parts)
 
 
 # ==================== Tab 2: Fancy Output ====================
@@ -100,20 +114,22 @@ class FancyOutput(QWebEngineView):
             def replace_math(match):
                 block = match.group(0)
                 block = balance_latex_delimiters(block)
-                math_blocks.append(block)
+                # Escaped for HTML safety right away, restored verbatim in step 3
+                math_blocks.append(block.translate(HTML_ESCAPE_TABLE))
                 return f"MATHJAXBLOCKPLACEHOLDER{len(math_blocks)-1}END"
 
-            # Match both display (\[...\]) and inline (\(...\)) math
-            pattern = re.compile(r'(\\\[.*?\\\])|(\\\(.*?\\\))', re.DOTALL)
-            processed_md = pattern.sub(replace_math, md_content)
+            processed_md = MATH_PATTERN.sub(replace_math, md_content)
 
             # 2. Convert markdown to HTML
-            html_content = markdown.markdown(processed_md, extensions=['tables', 'fenced_code', 'nl2br'])
+            html_content = MARKDOWN_RENDERER.reset().convert(processed_md)
 
-            # 3. Restore LaTeX blocks, escaped for HTML safety
-            for i, block in enumerate(math_blocks):
-                safe_block = html.escape(block)
-                html_content = html_content.replace(f"MATHJAXBLOCKPLACEHOLDER{i}END", safe_block)
+            # 3. Restore LaTeX blocks (one pass for all blocks)
+            def restore_math(m):
+                # Out-of-range index: the placeholder text came from the OCR output itself
+                i = int(m.group(1))
+                return math_blocks[i] if i < len(math_blocks) else m.group(0)
+
+            html_content = PLACEHOLDER_PATTERN.sub(restore_math, html_content)
 
             # 4. Setup MathJax
             base_path = os.path.dirname(os.path.abspath(__file__))
@@ -208,6 +224,14 @@ class OutputPanel(QWidget):
         self.text_output.setReadOnly(True)
         raw_layout.addWidget(self.text_output)
 
+        # Streamed chunks are buffered and inserted together, one text
+        # layout/repaint per batch instead of one per token
+        self.pending_text = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(30)
+        self.flush_timer.timeout.connect(self.flush_text)
+
         # Tab 2: Fancy Output
         self.web_view = FancyOutput()
 
@@ -252,6 +276,18 @@ class OutputPanel(QWidget):
         if self.tabs.isTabEnabled(1):
             self.tabs.setTabEnabled(1, False)
 
+        self.pending_text.append(text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush_text(self):
+        # Insert all buffered chunks at once.
+        self.flush_timer.stop()
+        if not self.pending_text:
+            return
+        text = "".join(self.pending_text)
+        self.pending_text.clear()
+
         # Move cursor to end, insert text, keep cursor at end (auto-scroll)
         self.text_output.moveCursor(QTextCursor.End)
         self.text_output.insertPlainText(text)
@@ -260,6 +296,7 @@ class OutputPanel(QWidget):
     # ==================== Tab 2: Fancy Output ====================
     def render_fancy_output(self):
         # Convert raw text to rendered markdown.
+        self.flush_text()
         raw_md = self.text_output.toPlainText()
         if not raw_md.strip():
             return
@@ -270,6 +307,8 @@ class OutputPanel(QWidget):
 
     # ==================== Utility ====================
     def clear(self):
+        self.flush_timer.stop()
+        self.pending_text.clear()
         self.text_output.clear()
         self.web_view.set_markdown("")
         self.tabs.setTabEnabled(1, False)
@@ -277,6 +316,7 @@ class OutputPanel(QWidget):
 
     def copy_output(self):
         if self.tabs.currentIndex() == 0:
+            self.flush_text()
             self.text_output.selectAll()
             self.text_output.copy()
         else:
@@ -2,13 +2,8 @@
 # Windows-specific feature: Shows progress bar on the app's taskbar icon.
 # Uses COM (Component Object Model) to interact with Windows Shell APIs.
 
-import ctypes
-from ctypes import wintypes, POINTER, Structure, c_ulong, c_void_p, HRESULT
-
-# GUIDs (globally unique identifiers) for Windows COM interfaces
-# These are fixed IDs defined by Microsoft to access taskbar features
-CLSID_TaskbarList = "{56FDF344-FD6D-11d0-958A-006097C9A090}"
-IID_ITaskbarList3 = "{EA1AFB91-9E28-4B86-90E9-9E9F8A5EEFAF}"
+import atexit
+import config
 
 # Progress bar states - these control the color/behavior of the taskbar icon
 TBPF_NOPROGRESS = 0x00  # No progress indicator
@@ -17,115 +12,229 @@ TBPF_NORMAL = 0x02  # Green progress bar
 TBPF_ERROR = 0x04 # Red error state
 TBPF_PAUSED = 0x08 # Yellow paused state
 
-
-# ==================== COM Structure Definitions ====================
-# These mirror Windows C++ structures in Python for interop
-
-class GUID(Structure):
-    # 128-bit globally unique identifier structure.
-    # Used to identify COM interfaces and classes.
-    _fields_ = [
-        ('Data1', c_ulong),
-        ('Data2', ctypes.c_ushort),
-        ('Data3', ctypes.c_ushort),
-        ('Data4', ctypes.c_ubyte * 8)
-    ]
-    def __init__(self, guid_str):
-        from uuid import UUID
-        u = UUID(guid_str)
-        # Split UUID into Windows GUID format components
-        self.Data1 = u.time_low
-        self.Data2 = u.time_mid
-        self.Data3 = u.time_hi_version
-        self.Data4 = (ctypes.c_ubyte * 8)(*u.bytes[8:])
-
-class ITaskbarList3(Structure):
-    # Forward declaration for the COM interface pointer.
-    pass
-
-class ITaskbarList3Vtbl(Structure):
-    """
-    Virtual function table (vtable) for ITaskbarList3.
-
-    In COM, objects expose their methods through vtables - arrays of
-    function pointers. This structure mirrors the C++ vtable layout
-    so we can call Windows API methods from Python.
-
-    Methods are inherited through the interface hierarchy:
-    IUnknown -> ITaskbarList -> ITaskbarList2 -> ITaskbarList3
-    """
-    _fields_ = [
-        # IUnknown methods (base COM interface)
-        ('QueryInterface', c_void_p),
-        ('AddRef', c_void_p),
-        ('Release', c_void_p),
-        # ITaskbarList methods
-        ('HrInit', c_void_p),
-        ('AddTab', c_void_p),
-        ('DeleteTab', c_void_p),
-        ('ActivateTab', c_void_p),
-        ('SetActiveAlt', c_void_p),
-        # ITaskbarList2 methods
-        ('MarkFullscreenWindow', c_void_p),
-        # ITaskbarList3 methods - these are what we actually use
-        ('SetProgressValue', ctypes.WINFUNCTYPE(HRESULT, POINTER(ITaskbarList3), wintypes.HWND, ctypes.c_ulonglong, ctypes.c_ulonglong)),
-        ('SetProgressState', ctypes.WINFUNCTYPE(HRESULT, POINTER(ITaskbarList3), wintypes.HWND, ctypes.c_int)),
-    ]
-
-# Complete the forward declaration by assigning vtable pointer field
-ITaskbarList3._fields_ = [('lpVtbl', POINTER(ITaskbarList3Vtbl))]
-
-
-class TaskbarProgress:
-    # High-level wrapper for Windows taskbar progress API.
-    def __init__(self):
-        self._taskbar = None
-        self._initialized = False
-        try:
-            self._init_com()
-        except Exception as e:
-            print(f"Warning: Failed to init taskbar progress: {e}")
-
-    def _init_com(self):
-        # Initialize COM library and create TaskbarList object.
-        # CoInitialize: Required before using any COM functions
-        try:
-            ctypes.windll.ole32.CoInitialize(None)
-        except:
-            pass  # Might already be initialized by Qt
-
-        clsid = GUID(CLSID_TaskbarList)
-        iid = GUID(IID_ITaskbarList3)
-
-        self._taskbar = POINTER(ITaskbarList3)()
-
-        # CoCreateInstance: Creates a COM object and returns interface pointer
-        # Parameters: class ID, outer object (for aggregation), context, interface ID, output pointer
-        res = ctypes.windll.ole32.CoCreateInstance(
-            ctypes.byref(clsid),
-            None,
-            1,  # CLSCTX_INPROC_SERVER = load as in-process DLL
-            ctypes.byref(iid),
-            ctypes.byref(self._taskbar)
+# The shell repaints the taskbar icon at roughly 10 Hz, faster updates are invisible
+MIN_UPDATE_INTERVAL = 0.08 # seconds
+
+
+if not config.WIN_TASKBAR_PROGRESS_SUPPORT:
+    # Other platforms: same API, does nothing.
+    # Skips ctypes and the COM type setup below, which only exist on Windows.
+    class TaskbarProgress:
+        __slots__ = ()
+
+        def begin(self, hwnd, total): pass
+        def update(self, current): pass
+        def stop_progress(self): pass
+        def close(self): pass
+
+else:
+    import ctypes
+    from functools import partial
+    from time import monotonic
+    from ctypes import wintypes, POINTER, Structure, c_ulong, c_void_p, HRESULT
+
+    COINIT_APARTMENTTHREADED = 0x2 # Single-threaded apartment, what the UI thread uses
+    S_OK = 0
+    S_FALSE = 1 # COM was already initialized on this thread (still needs CoUninitialize)
+    RPC_E_CHANGED_MODE = -2147417850 # 0x80010106: already initialized as multithreaded
+
+
+    # ==================== COM Structure Definitions ====================
+    # These mirror Windows C++ structures in Python for interop
+
+    class GUID(Structure):
+        # 128-bit globally unique identifier structure.
+        # Used to identify COM interfaces and classes.
+        _fields_ = [
+            ('Data1', c_ulong),
+            ('Data2', ctypes.c_ushort),
+            ('Data3', ctypes.c_ushort),
+            ('Data4', ctypes.c_ubyte * 8)
+        ]
+
+    # GUIDs (globally unique identifiers) for Windows COM interfaces
+    # These are fixed IDs defined by Microsoft to access taskbar features
+    # Stored as raw GUID memory (Data1-3 little-endian, Data4 as-is, i.e. UUID.bytes_le)
+    # so nothing has to be parsed at runtime
+    CLSID_TaskbarList = GUID.from_buffer_copy(b"\x44\xf3\xfd\x56\x6d\xfd\xd0\x11\x95\x8a\x00\x60\x97\xc9\xa0\x90") # {56FDF344-FD6D-11d0-958A-006097C9A090}
+    IID_ITaskbarList3 = GUID.from_buffer_copy(b"\x91\xfb\x1a\xea\x28\x9e\x86\x4b\x90\xe9\x9e\x9f\x8a\x5e\xef\xaf") # {EA1AFB91-9E28-4B86-90E9-9E9F8A5EEFAF}
+
+    # ITaskbarList3 vtable slots.
+    # In COM, objects expose their methods through vtables - arrays of function
+    # pointers - and the interface pointer points at the vtable pointer.
+    # Methods are inherited through the interface hierarchy:
+    # IUnknown (0-2) -> ITaskbarList (3-7) -> ITaskbarList2 (8) -> ITaskbarList3 (9-)
+    # Only the slots we call are listed, the table is read as raw addresses.
+    VTBL_RELEASE = 2
+    VTBL_HRINIT = 3
+    VTBL_SETPROGRESSVALUE = 9
+    VTBL_SETPROGRESSSTATE = 10
+    VTBL_SIZE = 11
+
+    # Prototypes for the methods we call, built once at import.
+    # "this" (the interface pointer) is passed as a plain address (c_void_p).
+    # The per-tick ones return the HRESULT as a plain int (negative = failure) instead of raising.
+    SetProgressValueProto = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, wintypes.HWND, ctypes.c_ulonglong, ctypes.c_ulonglong)
+    SetProgressStateProto = ctypes.WINFUNCTYPE(ctypes.c_long, c_void_p, wintypes.HWND, ctypes.c_int)
+    ReleaseProto = ctypes.WINFUNCTYPE(c_ulong, c_void_p) # IUnknown::Release, returns the new refcount
+    HrInitProto = ctypes.WINFUNCTYPE(HRESULT, c_void_p) # HRESULT restype: raises OSError on failure
+
+    # ole32 prototypes, declared once at import so ctypes checks arguments
+    # against known types instead of guessing a conversion for each one.
+    # restype HRESULT makes a failing call raise OSError with the real error code.
+    # CoInitializeEx returns the raw HRESULT instead, see _init_com()
+    CoInitializeEx = ctypes.windll.ole32.CoInitializeEx
+    CoInitializeEx.argtypes = [c_void_p, wintypes.DWORD]
+    CoInitializeEx.restype = ctypes.c_long
+
+    CoUninitialize = ctypes.windll.ole32.CoUninitialize
+    CoUninitialize.argtypes = []
+    CoUninitialize.restype = None
+
+    # Parameters: class ID, outer object (for aggregation), context, interface ID, output pointer
+    CoCreateInstance = ctypes.windll.ole32.CoCreateInstance
+    CoCreateInstance.argtypes = [POINTER(GUID), c_void_p, wintypes.DWORD, POINTER(GUID), POINTER(c_void_p)]
+    CoCreateInstance.restype = HRESULT
+
+
+    class TaskbarProgress:
+        # High-level wrapper for Windows taskbar progress API.
+        # Use get_taskbar() instead of creating instances directly.
+        # Only call it from the UI thread: the interface pointer belongs to the
+        # apartment that created it, and MainWindow drives it from Qt slots,
+        # never from the OCR worker thread.
+        # Fixed attribute set: update() reads several of these per tick
+        __slots__ = (
+            '_taskbar', '_initialized', '_com_initialized',
+            '_set_state', '_set_value', '_release',
+            '_last_state', '_last_ts', '_next_value',
+            '_c_hwnd', '_c_total', '_total',
         )
 
-        if res == 0:  # S_OK = success
-            self._initialized = True
-
-    def set_progress(self, hwnd, current, total):
-        # Set the taskbar progress bar.
-        if not self._initialized or not self._taskbar: return
-        try:
-            # Navigate: pointer -> contents -> vtable pointer -> vtable -> method
-            self._taskbar.contents.lpVtbl.contents.SetProgressState(self._taskbar, hwnd, TBPF_NORMAL)
-            self._taskbar.contents.lpVtbl.contents.SetProgressValue(self._taskbar, hwnd, current, total)
-        except Exception:
-            pass
-
-    def stop_progress(self, hwnd):
-        # Remove the progress bar from taskbar icon.
-        if not self._initialized or not self._taskbar: return
-        try:
-            self._taskbar.contents.lpVtbl.contents.SetProgressState(self._taskbar, hwnd, TBPF_NOPROGRESS)
-        except Exception:
-            pass
+        def __init__(self):
+            self._taskbar = None
+            self._initialized = False
+            self._com_initialized = False # Whether our CoInitializeEx call succeeded (needs a matching CoUninitialize)
+            self._set_state = None # Cached vtable methods, see _init_com()
+            self._set_value = None
+            self._release = None
+            self._last_state = TBPF_NOPROGRESS # Last state sent to the taskbar
+            self._last_ts = 0.0 # monotonic() time of the last value update
+            self._next_value = 0 # Smallest value that moves the bar by at least one promille
+            self._c_hwnd = None # Window and item count of the current run, see begin()
+            self._c_total = None
+            self._total = 1
+            try:
+                self._init_com()
+            except Exception as e:
+                print(f"Warning: Failed to init taskbar progress: {e}")
+
+        def _init_com(self):
+            # Initialize COM library and create TaskbarList object.
+            # CoInitializeEx: Required before using any COM functions.
+            # Qt usually initializes COM on the UI thread first, both outcomes are fine
+            hr = CoInitializeEx(None, COINIT_APARTMENTTHREADED)
+            if hr == S_OK or hr == S_FALSE:
+                self._com_initialized = True # Each successful call is balanced in close()
+            elif hr != RPC_E_CHANGED_MODE: # MTA works too, but the call added no reference to undo
+                raise ctypes.WinError(hr)
+
+            self._taskbar = c_void_p() # Interface pointer
+
+            # CoCreateInstance: Creates a COM object and returns interface pointer
+            # Raises on failure, which __init__ reports instead of leaving the progress bar silently dead
+            CoCreateInstance(
+                ctypes.byref(CLSID_TaskbarList),
+                None,
+                1,  # CLSCTX_INPROC_SERVER = load as in-process DLL
+                ctypes.byref(IID_ITaskbarList3),
+                ctypes.byref(self._taskbar)
+            )
+
+            if self._taskbar:
+                # Read the slots once here instead of on every call:
+                # interface pointer -> vtable pointer -> function addresses
+                this = self._taskbar.value
+                vtbl = (c_void_p * VTBL_SIZE).from_address(c_void_p.from_address(this).value)
+                # Bound first, so close() can release the object even if HrInit fails
+                self._release = partial(ReleaseProto(vtbl[VTBL_RELEASE]), this)
+                # ITaskbarList requires HrInit before any other method is used
+                # (raises OSError if the taskbar is unavailable)
+                HrInitProto(vtbl[VTBL_HRINIT])(this)
+                # Wrap the raw slot addresses in the prototypes and bind "this" up front,
+                # so each call only passes the per-call arguments
+                self._set_state = partial(SetProgressStateProto(vtbl[VTBL_SETPROGRESSSTATE]), this)
+                self._set_value = partial(SetProgressValueProto(vtbl[VTBL_SETPROGRESSVALUE]), this)
+                self._initialized = True
+
+        def begin(self, hwnd, total):
+            # Start a progress run of total items on window hwnd, at 0.
+            # hwnd and total stay fixed for the run, so they are converted to
+            # ctypes values once here and passed as-is on every update().
+            if not self._initialized or not self._taskbar: return
+            self._c_hwnd = wintypes.HWND(hwnd)
+            self._c_total = ctypes.c_ulonglong(total)
+            self._total = max(total, 1)
+            self._next_value = 0 # Next run must not be deduplicated against the last one
+            self.update(0)
+
+        def update(self, current):
+            # Set the taskbar progress bar to current (out of the total given to begin()).
+            if not self._initialized or not self._taskbar or self._c_hwnd is None: return
+
+            # Drop updates that would not change the visible bar (progress only moves
+            # forward within a run), a single int compare with no division
+            if current < self._next_value: return
+            now = monotonic()
+            # Throttle to the taskbar's repaint rate, but always let start and end through
+            if now - self._last_ts < MIN_UPDATE_INTERVAL and current < self._total and current != 0: return
+            self._last_ts = now
+            # Smallest value whose promille (0-1000) is above the current one:
+            # ceil((pct + 1) * total / 1000)
+            self._next_value = -(-(current * 1000 // self._total + 1) * self._total // 1000)
+
+            # No SetProgressState(TBPF_NORMAL) needed: SetProgressValue switches the bar
+            # to normal by itself unless it was set to error/paused, which we never do.
+            # One COM call per tick.
+            if self._set_value(self._c_hwnd, current, self._c_total) < 0:
+                self._initialized = False # Taskbar gone (e.g. Explorer restarted), stop trying
+                return
+            self._last_state = TBPF_NORMAL
+
+        def stop_progress(self):
+            # Remove the progress bar from taskbar icon.
+            if not self._initialized or not self._taskbar: return
+            if self._last_state == TBPF_NOPROGRESS: return
+            if self._set_state(self._c_hwnd, TBPF_NOPROGRESS) < 0:
+                self._initialized = False
+                return
+            self._last_state = TBPF_NOPROGRESS
+
+        def close(self):
+            # Release the taskbar object and balance our CoInitializeEx.
+            # Safe to call more than once (atexit and __del__ both end up here).
+            self._initialized = False
+            self._set_state = self._set_value = None # Would point into the released object
+            if self._release:
+                self._release()
+                self._release = None
+            self._taskbar = None
+            if self._com_initialized:
+                CoUninitialize()
+                self._com_initialized = False
+
+        __del__ = close
+
+
+# ==================== Shared Instance ====================
+# Creating the taskbar object loads the shell's in-process server,
+# so the whole app shares one instance, released at exit.
+_instance = None
+
+def get_taskbar():
+    # Return the process-wide TaskbarProgress, creating it on first use.
+    global _instance
+    if _instance is None:
+        _instance = TaskbarProgress()
+        atexit.register(_instance.close)
+    return _instance